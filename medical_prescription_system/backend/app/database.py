@@ -1,14 +1,13 @@
-import pandas as pd
-import json
 from pathlib import Path
-from typing import List, Dict, Any
+from types import MappingProxyType
+from typing import List, Dict, Mapping, Tuple
 
 class DrugDatabase:
     def __init__(self):
         self.data_path = Path("data")
-        self.interactions_df = None
-        self.dosages_df = None
-        self.alternatives_df = None
+        self.interactions_by_drug: Dict[str, List[Tuple[str, Dict]]] = {}
+        self.dosages_idx: Dict[Tuple[str, str], Dict] = {}
+        self.alternatives_idx: Dict[str, List[Dict]] = {}
         self.load_data()
     
     def load_data(self):
@@ -29,7 +28,6 @@ class DrugDatabase:
                  "mechanism": "Quinidine inhibits P-glycoprotein",
                  "management": "Reduce digoxin dose by 50%"},
             ]
-            self.interactions_df = pd.DataFrame(interactions_data)
             
             # Load dosage recommendations
             dosage_data = [
@@ -42,7 +40,6 @@ class DrugDatabase:
                 {"drug": "ibuprofen", "age_group": "adult", "min_dose": 400, 
                  "max_dose": 800, "frequency": "q8h", "unit": "mg"},
             ]
-            self.dosages_df = pd.DataFrame(dosage_data)
             
             # Load alternative medications
             alternatives_data = [
@@ -51,59 +48,57 @@ class DrugDatabase:
                 {"original": "warfarin", "alternative": "rivaroxaban", 
                  "reason": "Monitoring burden", "safety_profile": "No routine monitoring required"},
             ]
-            self.alternatives_df = pd.DataFrame(alternatives_data)
+            
+            # Index records by their lookup keys
+            for record in interactions_data:
+                drug1, drug2 = record['drug1'].lower(), record['drug2'].lower()
+                self.interactions_by_drug.setdefault(drug1, []).append((drug2, record))
+                self.interactions_by_drug.setdefault(drug2, []).append((drug1, record))
+            
+            for record in dosage_data:
+                key = (record['drug'].lower(), record['age_group'])
+                self.dosages_idx.setdefault(key, record)
+            
+            for record in alternatives_data:
+                self.alternatives_idx.setdefault(record['original'].lower(), []).append(record)
             
         except Exception as e:
             print(f"Error loading data: {e}")
-            # Initialize with empty DataFrames if files don't exist
-            self.interactions_df = pd.DataFrame()
-            self.dosages_df = pd.DataFrame()
-            self.alternatives_df = pd.DataFrame()
+            # Initialize with empty indexes if files don't exist
+            self.interactions_by_drug = {}
+            self.dosages_idx = {}
+            self.alternatives_idx = {}
     
-    def get_drug_interactions(self, drugs: List[str]) -> List[Dict]:
-        """Get interactions between provided drugs"""
+    def get_drug_interactions(self, drugs: List[str]) -> List[Mapping]:
+        """Get interactions between provided drugs as read-only records"""
         interactions = []
-        if self.interactions_df.empty:
+        if not self.interactions_by_drug:
             return interactions
-            
-        for i, drug1 in enumerate(drugs):
-            for drug2 in drugs[i+1:]:
-                # Check both directions
-                interaction = self.interactions_df[
-                    ((self.interactions_df['drug1'] == drug1.lower()) & 
-                     (self.interactions_df['drug2'] == drug2.lower())) |
-                    ((self.interactions_df['drug1'] == drug2.lower()) & 
-                     (self.interactions_df['drug2'] == drug1.lower()))
-                ]
-                if not interaction.empty:
-                    interactions.extend(interaction.to_dict('records'))
+        
+        # Walk each drug's known partners instead of every drug pair
+        drugs_lower = [drug.lower() for drug in drugs]
+        drug_set = set(drugs_lower)
+        for drug in dict.fromkeys(drugs_lower):
+            for partner, record in self.interactions_by_drug.get(drug, []):
+                # Emit each pair once, from its lexically smaller drug
+                if partner in drug_set and partner > drug:
+                    interactions.append(MappingProxyType(record))
         
         return interactions
     
-    def get_dosage_recommendation(self, drug: str, age_group: str) -> Dict:
-        """Get dosage recommendation for specific drug and age group"""
-        if self.dosages_df.empty:
-            return {}
-            
-        dosage = self.dosages_df[
-            (self.dosages_df['drug'] == drug.lower()) & 
-            (self.dosages_df['age_group'] == age_group)
-        ]
+    def get_dosage_recommendation(self, drug: str, age_group: str) -> Mapping:
+        """Get dosage recommendation for specific drug and age group as a read-only record"""
+        dosage = self.dosages_idx.get((drug.lower(), age_group))
         
-        if not dosage.empty:
-            return dosage.iloc[0].to_dict()
+        if dosage:
+            return MappingProxyType(dosage)
         return {}
     
-    def get_alternatives(self, drug: str) -> List[Dict]:
-        """Get alternative medications for a drug"""
-        if self.alternatives_df.empty:
-            return []
-            
-        alternatives = self.alternatives_df[
-            self.alternatives_df['original'] == drug.lower()
-        ]
+    def get_alternatives(self, drug: str) -> List[Mapping]:
+        """Get alternative medications for a drug as read-only records"""
+        alternatives = self.alternatives_idx.get(drug.lower(), [])
         
-        return alternatives.to_dict('records')
+        return [MappingProxyType(record) for record in alternatives]
 
 # Global database instance
 drug_db = DrugDatabase()
\ No newline at end of file
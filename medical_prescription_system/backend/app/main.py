@@ -1,6 +1,6 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from typing import List
 import uvicorn
 
@@ -10,7 +10,8 @@ from .routers import prescription
 app = FastAPI(
     title="AI Medical Prescription Verification API",
     description="API for analyzing drug interactions, dosages, and alternatives",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -61,4 +61,11 @@ class AnalysisResponse(BaseModel):
     dosage_recommendations: List[DosageRecommendation]
     alternatives: List[AlternativeDrug]
     warnings: List[str]
-    is_safe: bool
\ No newline at end of file
+    is_safe: bool
+
+class BatchOperation(BaseModel):
+    op: str  # extract, analyze
+    arg: Any
+
+class BatchRequest(BaseModel):
+    ops: List[BatchOperation]
\ No newline at end of file
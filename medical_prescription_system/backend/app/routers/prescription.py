@@ -1,9 +1,15 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List, Dict, Any
+from fastapi.responses import ORJSONResponse
+from typing import List, Dict, Any, Optional, Tuple
+from cachetools import LRUCache, TTLCache
+import asyncio
+import hashlib
 import logging
+import orjson
 
 from ..models import (PrescriptionRequest, AnalysisResponse, DrugModel, 
-                     PatientModel, DrugInteraction, DosageRecommendation, AlternativeDrug)
+                     PatientModel, DrugInteraction, DosageRecommendation, AlternativeDrug,
+                     BatchOperation, BatchRequest)
 from ..services.drug_interaction import DrugInteractionDetector
 from ..services.dosage_calculator import DosageCalculator
 from ..services.alternative_finder import AlternativeFinder
@@ -17,65 +23,205 @@ dosage_calculator = DosageCalculator()
 alternative_finder = AlternativeFinder()
 nlp_extractor = NLPDrugExtractor()
 
-@router.post("/analyze-prescription", response_model=AnalysisResponse)
-async def analyze_prescription(request: PrescriptionRequest):
-    """Analyze a prescription for drug interactions, dosages, and alternatives"""
-    try:
-        # Extract drugs from raw text if provided
-        if request.raw_text and not request.drugs:
-            extracted_drugs = nlp_extractor.extract_drug_information(request.raw_text)
-            request.drugs = [DrugModel(**drug) for drug in extracted_drugs]
-        
-        if not request.drugs:
-            raise HTTPException(status_code=400, detail="No drugs found in the prescription")
+class ExtractionBatcher:
+    """Collect concurrent extraction requests into one batched NER call"""
+    
+    def __init__(self, extractor: NLPDrugExtractor, max_batch: int = 16, 
+                 max_wait: float = 0.02):
+        self.extractor = extractor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._cache: LRUCache = LRUCache(maxsize=2048)
+    
+    async def extract(self, text: str) -> List[Dict]:
+        """Queue text for the next batch and wait for its drugs"""
+        cached = self._cache.get(text)
+        if cached is not None:
+            return [dict(drug) for drug in cached]
         
-        drug_names = [drug.name for drug in request.drugs]
+        drugs = await self._submit(text)
+        self._cache[text] = [dict(drug) for drug in drugs]
+        return drugs
+    
+    async def _submit(self, text: str) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            # Created lazily so they bind to the running event loop, and
+            # recreated when requests arrive on a different loop
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+            self._loop = loop
         
+        future = loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Tuple[str, asyncio.Future]] = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            texts = [text for text, _ in batch]
+            try:
+                results = await asyncio.to_thread(
+                    self.extractor.extract_drug_information_batch, texts
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, future), drugs in zip(batch, results):
+                if not future.done():
+                    future.set_result(drugs)
+
+extraction_batcher = ExtractionBatcher(nlp_extractor)
+
+# Recent analyses keyed by a hash of the canonical request payload
+analysis_cache: TTLCache = TTLCache(maxsize=1024, ttl=300)
+analysis_cache_lock = asyncio.Lock()
+
+def _analysis_cache_key(request: PrescriptionRequest) -> str:
+    payload = orjson.dumps(request.model_dump(), option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+async def _analyze_cached(key: str, request: PrescriptionRequest) -> AnalysisResponse:
+    """Return the cached analysis for key, computing and storing it on a miss"""
+    async with analysis_cache_lock:
+        cached = analysis_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    response = await _analyze(request)
+    
+    async with analysis_cache_lock:
+        analysis_cache[key] = response
+    return response
+
+async def _analyze(request: PrescriptionRequest) -> AnalysisResponse:
+    # Extract drugs from raw text if provided
+    if request.raw_text and not request.drugs:
+        extracted_drugs = await extraction_batcher.extract(request.raw_text)
+        request.drugs = [DrugModel(**drug) for drug in extracted_drugs]
+    
+    if not request.drugs:
+        raise HTTPException(status_code=400, detail="No drugs found in the prescription")
+    
+    drug_names = [drug.name for drug in request.drugs]
+    # Normalised once and shared by every service below
+    drug_names_lower = [name.lower() for name in drug_names]
+    
+    async def interactions_and_alternatives():
         # 1. Detect drug interactions
-        interactions = interaction_detector.detect_interactions(drug_names)
-        
-        # 2. Calculate appropriate dosages
-        dosage_recommendations = dosage_calculator.calculate_dosage(request.patient, drug_names)
-        
-        # 3. Find alternative medications
-        interaction_names = [f"{i.drug1}-{i.drug2}" for i in interactions]
-        alternatives = alternative_finder.find_alternatives(
-            drug_names, request.patient, interaction_names
+        interactions = await asyncio.to_thread(
+            interaction_detector.detect_interactions, drug_names, drug_names_lower
         )
         
-        # 4. Check for contraindications
-        warnings = interaction_detector.check_contraindications(
-            drug_names, request.patient.medical_conditions
-        )
-        
-        # 5. Calculate overall safety
-        risk_score = interaction_detector.calculate_risk_score(interactions)
-        is_safe = risk_score < 50  # Threshold for safety
-        
-        response = AnalysisResponse(
-            interactions=interactions,
-            dosage_recommendations=dosage_recommendations,
-            alternatives=alternatives,
-            warnings=warnings,
-            is_safe=is_safe
+        # 3. Find alternative medications (needs only the interactions)
+        interaction_names = [f"{i.drug1}-{i.drug2}" for i in interactions]
+        alternatives = await asyncio.to_thread(
+            alternative_finder.find_alternatives,
+            drug_names, request.patient, interaction_names, drug_names_lower
         )
-        
-        return response
+        return interactions, alternatives
+    
+    # 2. Calculate appropriate dosages, 4. Check for contraindications.
+    # Independent of 1 and 3, so all run concurrently in worker threads;
+    # gathered together so a failure in one still retrieves the others' outcomes
+    (interactions, alternatives), dosage_recommendations, warnings = await asyncio.gather(
+        interactions_and_alternatives(),
+        asyncio.to_thread(
+            dosage_calculator.calculate_dosage, request.patient, drug_names, drug_names_lower
+        ),
+        asyncio.to_thread(
+            interaction_detector.check_contraindications,
+            drug_names, request.patient.medical_conditions, drug_names_lower
+        ),
+    )
+    
+    # 5. Calculate overall safety
+    risk_score = interaction_detector.calculate_risk_score(interactions)
+    is_safe = risk_score < 50  # Threshold for safety
+    
+    return AnalysisResponse.model_construct(
+        interactions=interactions,
+        dosage_recommendations=dosage_recommendations,
+        alternatives=alternatives,
+        warnings=warnings,
+        is_safe=is_safe
+    )
+
+async def _analyze_or_500(request: PrescriptionRequest) -> AnalysisResponse:
+    try:
+        key = _analysis_cache_key(request)
+        return await _analyze_cached(key, request)
         
     except Exception as e:
         logging.error(f"Error analyzing prescription: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+@router.post("/analyze-prescription", response_model=AnalysisResponse)
+async def analyze_prescription(request: PrescriptionRequest):
+    """Analyze a prescription for drug interactions, dosages, and alternatives"""
+    response = await _analyze_or_500(request)
+    # Returned as a Response so the constructed models are never validated
+    # against response_model, whatever FastAPI's or pydantic's revalidation
+    # settings; response_model still documents the endpoint
+    return ORJSONResponse(response.model_dump(mode="json"))
+
 @router.post("/extract-drugs")
 async def extract_drugs(text: str):
     """Extract drug information from unstructured text"""
     try:
-        extracted_drugs = nlp_extractor.extract_drug_information(text)
+        extracted_drugs = await extraction_batcher.extract(text)
         return {"drugs": extracted_drugs}
     except Exception as e:
         logging.error(f"Error extracting drugs: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Drug extraction failed: {str(e)}")
 
+async def _run_batch_operation(operation: BatchOperation) -> Dict[str, Any]:
+    if operation.op == "extract":
+        if not isinstance(operation.arg, str):
+            raise HTTPException(status_code=400, detail="extract expects the prescription text as a string")
+        return await extract_drugs(operation.arg)
+    if operation.op == "analyze":
+        request = PrescriptionRequest.model_validate(operation.arg)
+        return (await _analyze_or_500(request)).model_dump(mode="json")
+    raise HTTPException(status_code=400, detail=f"Unknown operation: {operation.op}")
+
+@router.post("/batch")
+async def batch(request: BatchRequest):
+    """Run several operations in one round trip; results are returned by index"""
+    outcomes = await asyncio.gather(
+        *(_run_batch_operation(operation) for operation in request.ops),
+        return_exceptions=True
+    )
+    
+    results = []
+    for outcome in outcomes:
+        if isinstance(outcome, HTTPException):
+            results.append({"status_code": outcome.status_code, "detail": outcome.detail})
+        elif isinstance(outcome, Exception):
+            logging.error(f"Error in batch operation: {str(outcome)}")
+            results.append({"status_code": 400, "detail": str(outcome)})
+        else:
+            results.append({"status_code": 200, "result": outcome})
+    return {"results": results}
+
 @router.get("/drug-info/{drug_name}")
 async def get_drug_info(drug_name: str):
     """Get information about a specific drug"""
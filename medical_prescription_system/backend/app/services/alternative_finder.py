@@ -1,8 +1,12 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from ..models import AlternativeDrug, PatientModel
 from ..database import drug_db
 
 class AlternativeFinder:
+    # Safety profile keywords used for ranking
+    SAFETY_KEYWORDS_LOWER = tuple(k.lower() for k in 
+                                  ["safer", "better", "reduced risk", "well-tolerated"])
+    
     def __init__(self):
         self.therapeutic_equivalents = {
             "aspirin": ["clopidogrel", "ticagrelor"],
@@ -25,15 +29,19 @@ class AlternativeFinder:
         }
     
     def find_alternatives(self, drugs: List[str], patient: PatientModel, 
-                         interactions: List[str]) -> List[AlternativeDrug]:
+                         interactions: List[str], 
+                         drugs_lower: Optional[List[str]] = None) -> List[AlternativeDrug]:
         """Find alternative medications based on patient profile and interactions"""
         alternatives = []
+        if drugs_lower is None:
+            drugs_lower = [drug.lower() for drug in drugs]
+        conditions_lower = [condition.lower() for condition in patient.medical_conditions]
         
-        for drug in drugs:
+        for drug, drug_lower in zip(drugs, drugs_lower):
             # Check database alternatives
-            db_alternatives = drug_db.get_alternatives(drug)
+            db_alternatives = drug_db.get_alternatives(drug_lower)
             for alt in db_alternatives:
-                alternatives.append(AlternativeDrug(
+                alternatives.append(AlternativeDrug.model_construct(
                     original_drug=drug,
                     alternative_drug=alt['alternative'],
                     reason=alt['reason'],
@@ -41,9 +49,9 @@ class AlternativeFinder:
                 ))
             
             # Check therapeutic equivalents
-            if drug.lower() in self.therapeutic_equivalents:
-                for alt_drug in self.therapeutic_equivalents[drug.lower()]:
-                    alternatives.append(AlternativeDrug(
+            if drug_lower in self.therapeutic_equivalents:
+                for alt_drug in self.therapeutic_equivalents[drug_lower]:
+                    alternatives.append(AlternativeDrug.model_construct(
                         original_drug=drug,
                         alternative_drug=alt_drug,
                         reason="Therapeutic equivalent",
@@ -51,12 +59,12 @@ class AlternativeFinder:
                     ))
             
             # Check condition-specific alternatives
-            for condition in patient.medical_conditions:
-                if (condition.lower() in self.contraindication_alternatives and 
-                    drug.lower() in self.contraindication_alternatives[condition.lower()]):
+            for condition, condition_lower in zip(patient.medical_conditions, conditions_lower):
+                if (condition_lower in self.contraindication_alternatives and 
+                    drug_lower in self.contraindication_alternatives[condition_lower]):
                     
-                    alt_drug = self.contraindication_alternatives[condition.lower()][drug.lower()]
-                    alternatives.append(AlternativeDrug(
+                    alt_drug = self.contraindication_alternatives[condition_lower][drug_lower]
+                    alternatives.append(AlternativeDrug.model_construct(
                         original_drug=drug,
                         alternative_drug=alt_drug,
                         reason=f"Safer in {condition}",
@@ -68,14 +76,13 @@ class AlternativeFinder:
     def rank_alternatives(self, alternatives: List[AlternativeDrug], 
                          patient: PatientModel) -> List[AlternativeDrug]:
         """Rank alternatives based on patient-specific factors"""
-        # Simple ranking based on safety profile keywords
-        safety_keywords = ["safer", "better", "reduced risk", "well-tolerated"]
-        
-        def safety_score(alt: AlternativeDrug) -> int:
-            score = 0
-            for keyword in safety_keywords:
-                if keyword.lower() in alt.safety_profile.lower():
-                    score += 1
-            return score
+        # Simple ranking based on safety profile keywords, scored once per
+        # alternative; the index keeps ties in their original order
+        scored = []
+        for i, alt in enumerate(alternatives):
+            profile = alt.safety_profile.lower()
+            score = sum(keyword in profile for keyword in self.SAFETY_KEYWORDS_LOWER)
+            scored.append((-score, i, alt))
+        scored.sort(key=lambda item: item[:2])
         
-        return sorted(alternatives, key=safety_score, reverse=True)
\ No newline at end of file
+        return [alt for _, _, alt in scored]
\ No newline at end of file
@@ -10,21 +10,30 @@ class DosageCalculator:
             "adult": (18, 64),
             "elderly": (65, 120)
         }
+        
+        # Age group for every age, indexed by age in years
+        self._age_table: List[AgeGroup] = [AgeGroup.ADULT] * (
+            max(max_age for _, max_age in self.age_groups.values()) + 1
+        )
+        for group_name, (min_age, max_age) in self.age_groups.items():
+            self._age_table[min_age:max_age + 1] = [AgeGroup(group_name)] * (max_age - min_age + 1)
     
     def determine_age_group(self, age: int) -> AgeGroup:
         """Determine age group based on patient age"""
-        for group_name, (min_age, max_age) in self.age_groups.items():
-            if min_age <= age <= max_age:
-                return AgeGroup(group_name)
+        if 0 <= age < len(self._age_table):
+            return self._age_table[age]
         return AgeGroup.ADULT  # Default fallback
     
-    def calculate_dosage(self, patient: PatientModel, drugs: List[str]) -> List[DosageRecommendation]:
+    def calculate_dosage(self, patient: PatientModel, drugs: List[str], 
+                         drugs_lower: Optional[List[str]] = None) -> List[DosageRecommendation]:
         """Calculate appropriate dosages for patient and drugs"""
         recommendations = []
         age_group = self.determine_age_group(patient.age)
+        if drugs_lower is None:
+            drugs_lower = [drug.lower() for drug in drugs]
         
-        for drug in drugs:
-            dosage_info = drug_db.get_dosage_recommendation(drug, age_group.value)
+        for drug, drug_lower in zip(drugs, drugs_lower):
+            dosage_info = drug_db.get_dosage_recommendation(drug_lower, age_group.value)
             
             if dosage_info:
                 # Adjust for weight if pediatric and weight is provided
@@ -50,11 +59,11 @@ class DosageCalculator:
                     drug, age_group, patient.medical_conditions
                 )
                 
-                recommendation = DosageRecommendation(
+                recommendation = DosageRecommendation.model_construct(
                     drug_name=drug,
                     age_group=age_group,
-                    min_dose=min_dose,
-                    max_dose=max_dose,
+                    min_dose=float(min_dose),
+                    max_dose=float(max_dose),
                     frequency=dosage_info['frequency'],
                     unit=unit,
                     special_instructions=special_instructions
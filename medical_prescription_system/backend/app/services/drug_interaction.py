@@ -1,6 +1,8 @@
-from typing import List, Dict
+from typing import List, Dict, FrozenSet, Optional
 from ..models import DrugInteraction, SeverityLevel
 from ..database import drug_db
+import heapq
+import numpy as np
 import re
 
 class DrugInteractionDetector:
@@ -11,14 +13,37 @@ class DrugInteractionDetector:
             "severe": 3,
             "contraindicated": 4
         }
+        self._severity_to_weight = {
+            SeverityLevel(severity): weight for severity, weight in self.severity_weights.items()
+        }
+        
+        self.contraindication_rules = {
+            "warfarin": ["active_bleeding", "pregnancy"],
+            "metformin": ["renal_failure", "heart_failure"],
+            "nsaids": ["peptic_ulcer", "renal_disease"],
+            "ace_inhibitors": ["pregnancy", "hyperkalemia"]
+        }
+        
+        # Reverse index: condition -> drugs contraindicated in it
+        contra_by_condition: Dict[str, set] = {}
+        for drug, conditions in self.contraindication_rules.items():
+            for condition in conditions:
+                contra_by_condition.setdefault(condition, set()).add(drug)
+        self._contra_by_condition: Dict[str, FrozenSet[str]] = {
+            condition: frozenset(drugs) for condition, drugs in contra_by_condition.items()
+        }
     
-    def detect_interactions(self, drugs: List[str]) -> List[DrugInteraction]:
-        """Detect drug interactions for given list of drugs"""
+    def detect_interactions(self, drugs: List[str], 
+                            drugs_lower: Optional[List[str]] = None,
+                            top_k: Optional[int] = None) -> List[DrugInteraction]:
+        """Detect drug interactions for given list of drugs, optionally only the top_k most severe"""
         interactions = []
-        raw_interactions = drug_db.get_drug_interactions(drugs)
+        raw_interactions = drug_db.get_drug_interactions(
+            drugs_lower if drugs_lower is not None else drugs
+        )
         
         for interaction in raw_interactions:
-            interactions.append(DrugInteraction(
+            interactions.append(DrugInteraction.model_construct(
                 drug1=interaction['drug1'],
                 drug2=interaction['drug2'],
                 severity=SeverityLevel(interaction['severity']),
@@ -27,38 +52,49 @@ class DrugInteractionDetector:
                 management=interaction['management']
             ))
         
-        # Sort by severity (most severe first)
-        interactions.sort(key=lambda x: self.severity_weights[x.severity.value], reverse=True)
+        # Sort by severity (most severe first), computing each weight once
+        weights = [self._severity_to_weight[i.severity] for i in interactions]
+        if top_k is not None:
+            # Ties keep their original order, as with the stable sort
+            order = heapq.nlargest(top_k, range(len(interactions)), key=weights.__getitem__)
+        else:
+            order = sorted(range(len(interactions)), key=weights.__getitem__, reverse=True)
         
-        return interactions
+        return [interactions[i] for i in order]
     
-    def check_contraindications(self, drugs: List[str], medical_conditions: List[str]) -> List[str]:
+    def check_contraindications(self, drugs: List[str], medical_conditions: List[str], 
+                                drugs_lower: Optional[List[str]] = None) -> List[str]:
         """Check for drug contraindications based on medical conditions"""
-        warnings = []
+        if drugs_lower is None:
+            drugs_lower = [drug.lower() for drug in drugs]
         
-        contraindication_rules = {
-            "warfarin": ["active_bleeding", "pregnancy"],
-            "metformin": ["renal_failure", "heart_failure"],
-            "nsaids": ["peptic_ulcer", "renal_disease"],
-            "ace_inhibitors": ["pregnancy", "hyperkalemia"]
-        }
+        drug_positions: Dict[str, List[int]] = {}
+        for i, drug_lower in enumerate(drugs_lower):
+            drug_positions.setdefault(drug_lower, []).append(i)
         
-        for drug in drugs:
-            drug_lower = drug.lower()
-            if drug_lower in contraindication_rules:
-                for condition in medical_conditions:
-                    if condition.lower() in contraindication_rules[drug_lower]:
-                        warnings.append(f"{drug} is contraindicated in {condition}")
+        # Intersect each condition's contraindicated drugs with the prescription
+        hits = []
+        for j, condition in enumerate(medical_conditions):
+            contraindicated = self._contra_by_condition.get(condition.lower())
+            if not contraindicated:
+                continue
+            for drug_lower in contraindicated & drug_positions.keys():
+                hits.extend((i, j) for i in drug_positions[drug_lower])
         
-        return warnings
+        # Report in drug order, then condition order
+        hits.sort()
+        return [f"{drugs[i]} is contraindicated in {medical_conditions[j]}" for i, j in hits]
     
     def calculate_risk_score(self, interactions: List[DrugInteraction]) -> float:
         """Calculate overall risk score based on interactions"""
         if not interactions:
             return 0.0
         
-        total_score = sum(self.severity_weights[interaction.severity.value] 
-                         for interaction in interactions)
+        weights = np.fromiter(
+            (self._severity_to_weight[interaction.severity] for interaction in interactions),
+            dtype=np.int32, count=len(interactions)
+        )
+        total_score = float(weights.sum())
         max_possible = len(interactions) * 4  # 4 is max severity weight
         
         return (total_score / max_possible) * 100 if max_possible > 0 else 0.0
\ No newline at end of file
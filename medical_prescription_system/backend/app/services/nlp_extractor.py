@@ -1,53 +1,198 @@
 import re
+import threading
+from pathlib import Path
 from typing import List, Dict, Optional
-from transformers import pipeline, AutoTokenizer, AutoModelForTokenClassification
+from transformers import AutoTokenizer, AutoModelForTokenClassification
+import numpy as np
 import torch
 
+try:
+    import hyperscan
+except ImportError:
+    # Optional: regex extraction falls back to the compiled re patterns
+    hyperscan = None
+
+try:
+    from optimum.onnxruntime import ORTModelForTokenClassification
+except ImportError:
+    # Optional: CPU inference falls back to the PyTorch model
+    ORTModelForTokenClassification = None
+
+NER_MODEL_NAME = "d4data/biomedical-ner-all"
+
+# Written by scripts/quantize_ner_model.py
+QUANTIZED_MODEL_DIR = Path(__file__).parent.parent / "data" / "biomedical-ner-int8"
+QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+
+# Guards the one-time NER model load across request threads
+_ner_load_lock = threading.Lock()
+
 class NLPDrugExtractor:
+    _DOSAGE_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(mg|ml|g|mcg)', re.IGNORECASE)
+    
     def __init__(self):
-        # Initialize NER model for medical entities
-        model_name = "d4data/biomedical-ner-all"
-        try:
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForTokenClassification.from_pretrained(model_name)
-            self.ner_pipeline = pipeline("ner", 
-                                        model=self.model, 
-                                        tokenizer=self.tokenizer,
-                                        aggregation_strategy="simple")
-        except:
-            # Fallback to basic extraction if model loading fails
-            self.ner_pipeline = None
+        # NER model for medical entities is loaded on first use
+        self.model_name = NER_MODEL_NAME
+        self._ner_available = False
+        self._ner_loaded = False
+        self.ner_batch_size = 8
         
         # Drug name patterns
-        self.drug_patterns = [
+        self.drug_patterns = [re.compile(p, re.IGNORECASE) for p in (
             r'\b(?:tab|tablet|cap|capsule|syrup|injection)\s+([A-Za-z]+)\s*(\d+(?:\.\d+)?)\s*(mg|ml|g|mcg)\b',
             r'\b([A-Za-z]+)\s+(\d+(?:\.\d+)?)\s*(mg|ml|g|mcg)\s*(?:tab|tablet|cap|capsule|syrup|injection)\b',
             r'\b([A-Za-z]+)\s*-?\s*(\d+(?:\.\d+)?)\s*(mg|ml|g|mcg)\b'
-        ]
+        )]
         
         # Frequency patterns
-        self.frequency_patterns = [
+        self.frequency_patterns = [re.compile(p, re.IGNORECASE) for p in (
             r'\b(?:once|twice|thrice|\d+\s*times?)\s*(?:daily|a\s*day|per\s*day)\b',
             r'\bq(?:8|12|24)h\b',
             r'\b(?:bid|tid|qid|od)\b',
             r'\bevery\s+(?:\d+\s*hours?|\d+\s*days?)\b'
-        ]
+        )]
+        
+        # Single-pass scanner over all drug patterns
+        self._hs_db = self._build_hyperscan_db()
+    
+    @property
+    def ner_ready(self) -> bool:
+        """Load the NER model on first access; False if it is unavailable"""
+        if not self._ner_loaded:
+            with _ner_load_lock:
+                if not self._ner_loaded:
+                    self._ner_available = self._load_ner_model()
+                    self._ner_loaded = True
+        return self._ner_available
+    
+    def _load_ner_model(self) -> bool:
+        """Load the tokenizer and token classification model"""
+        use_cuda = torch.cuda.is_available()
+        self.device = torch.device("cuda" if use_cuda else "cpu")
+        
+        # Prefer the INT8 ONNX model on CPU when it has been generated
+        if not use_cuda and ORTModelForTokenClassification is not None \
+                and (QUANTIZED_MODEL_DIR / QUANTIZED_MODEL_FILE).exists():
+            try:
+                self.tokenizer = AutoTokenizer.from_pretrained(QUANTIZED_MODEL_DIR)
+                self.model = ORTModelForTokenClassification.from_pretrained(
+                    QUANTIZED_MODEL_DIR, file_name=QUANTIZED_MODEL_FILE
+                )
+                self._build_label_lookup()
+                return True
+            except Exception as e:
+                print(f"Quantized NER model loading failed, using PyTorch: {e}")
+        
+        try:
+            with torch.inference_mode():
+                self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                self.model = AutoModelForTokenClassification.from_pretrained(
+                    self.model_name,
+                    torch_dtype=torch.float16 if use_cuda else torch.float32
+                ).to(self.device)
+                self.model.eval()
+            self._build_label_lookup()
+            return True
+        except Exception as e:
+            # Fallback to basic extraction if model loading fails
+            print(f"NER model loading failed: {e}")
+            return False
+    
+    def _build_label_lookup(self):
+        """Map label ids to entity group ids and begin flags for aggregation"""
+        self._entity_groups: List[str] = []
+        num_labels = len(self.model.config.id2label)
+        self._label_group = np.full(num_labels, -1, dtype=np.int64)  # -1 is "O"
+        self._label_begin = np.zeros(num_labels, dtype=bool)
+        
+        for label_id, label in self.model.config.id2label.items():
+            if label == "O":
+                continue
+            prefix, _, group = label.partition("-")
+            if prefix not in ("B", "I") or not group:
+                prefix, group = "I", label
+            if group not in self._entity_groups:
+                self._entity_groups.append(group)
+            self._label_group[int(label_id)] = self._entity_groups.index(group)
+            self._label_begin[int(label_id)] = prefix == "B"
     
     def extract_drug_information(self, text: str) -> List[Dict]:
         """Extract drug names, dosages, and frequencies from text"""
-        extracted_drugs = []
+        return self.extract_drug_information_batch([text])[0]
+    
+    def extract_drug_information_batch(self, texts: List[str]) -> List[List[Dict]]:
+        """Extract drug information for several texts with batched NER calls"""
+        batch_entities = [[] for _ in texts]
         
         # Try NER model first
-        if self.ner_pipeline:
-            try:
-                entities = self.ner_pipeline(text)
-                for entity in entities:
-                    if entity['entity_group'] in ['CHEMICAL', 'DRUG']:
-                        drug_info = self._extract_dosage_for_drug(text, entity['word'])
-                        if drug_info:
-                            extracted_drugs.append(drug_info)
-            except Exception as e:
-                print(f"NER extraction failed: {e}")
+        try:
+            if self.ner_ready and texts:
+                batch_entities = []
+                for i in range(0, len(texts), self.ner_batch_size):
+                    batch_entities.extend(self._ner_batch(texts[i:i + self.ner_batch_size]))
+        except Exception as e:
+            print(f"NER extraction failed: {e}")
+            batch_entities = [[] for _ in texts]
+        
+        return [self._drugs_from_entities(text, entities)
+                for text, entities in zip(texts, batch_entities)]
+    
+    def _ner_batch(self, texts: List[str]) -> List[List[Dict]]:
+        """Run the model on a padded batch and aggregate B-/I- tagged spans"""
+        encoding = self.tokenizer(list(texts), return_tensors="pt", truncation=True, 
+                                  padding=True, return_offsets_mapping=True)
+        offsets = encoding.pop("offset_mapping").numpy()
+        attention_mask = encoding["attention_mask"].numpy().astype(bool)
+        inputs = {key: value.to(self.device) for key, value in encoding.items()}
+        
+        with torch.inference_mode():
+            logits = self.model(**inputs).logits
+        labels = logits.argmax(-1).cpu().numpy()
+        
+        return [self._aggregate_entities(text, labels[i], offsets[i], attention_mask[i])
+                for i, text in enumerate(texts)]
+    
+    def _aggregate_entities(self, text: str, labels: np.ndarray, offsets: np.ndarray, 
+                            attention_mask: np.ndarray) -> List[Dict]:
+        """Merge consecutive tokens of the same entity group into character spans"""
+        groups = self._label_group[labels]
+        # Skip padding, special tokens (empty offsets) and "O" tokens
+        keep = attention_mask & (offsets[:, 1] > offsets[:, 0]) & (groups >= 0)
+        positions = np.flatnonzero(keep)
+        if positions.size == 0:
+            return []
+        
+        groups = groups[positions]
+        begins = self._label_begin[labels[positions]]
+        starts = offsets[positions, 0]
+        ends = offsets[positions, 1]
+        
+        # A new entity starts on a B- tag, a group change or a gap in tokens
+        new_entity = np.ones(positions.size, dtype=bool)
+        new_entity[1:] = begins[1:] | (groups[1:] != groups[:-1]) | (np.diff(positions) != 1)
+        first = np.flatnonzero(new_entity)
+        last = np.append(first[1:] - 1, positions.size - 1)
+        
+        entities = []
+        for f, l in zip(first, last):
+            start, end = int(starts[f]), int(ends[l])
+            entities.append({
+                'entity_group': self._entity_groups[groups[f]],
+                'word': text[start:end],
+                'start': start,
+                'end': end
+            })
+        return entities
+    
+    def _drugs_from_entities(self, text: str, entities: List[Dict]) -> List[Dict]:
+        """Build drug entries from NER entities for one text"""
+        extracted_drugs = []
+        
+        for entity in entities:
+            if entity['entity_group'] in ['CHEMICAL', 'DRUG']:
+                drug_info = self._extract_dosage_for_drug(text, entity['start'], entity['end'])
+                if drug_info:
+                    extracted_drugs.append(drug_info)
         
         # Fallback to regex patterns
         if not extracted_drugs:
@@ -55,56 +200,104 @@ class NLPDrugExtractor:
         
         return self._deduplicate_drugs(extracted_drugs)
     
+    def _build_hyperscan_db(self):
+        """Compile all regex patterns into one Hyperscan database, if available"""
+        if hyperscan is None:
+            return None
+        
+        expressions = [p.pattern.encode() for p in self.drug_patterns]
+        try:
+            db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+            db.compile(
+                expressions=expressions,
+                ids=list(range(len(expressions))),
+                elements=len(expressions),
+                flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST] * len(expressions)
+            )
+            return db
+        except Exception as e:
+            print(f"Hyperscan compilation failed: {e}")
+            return None
+    
     def _regex_extraction(self, text: str) -> List[Dict]:
         """Extract drugs using regex patterns"""
+        # Hyperscan offsets are byte offsets, so only scan ASCII text with it
+        if self._hs_db is not None and text.isascii():
+            return self._hyperscan_extraction(text)
+        
         drugs = []
-        text_lower = text.lower()
         
         for pattern in self.drug_patterns:
-            matches = re.finditer(pattern, text_lower)
-            for match in matches:
-                drug_name = match.group(1)
-                dosage = match.group(2)
-                unit = match.group(3)
-                
+            for match in pattern.finditer(text):
                 # Extract frequency for this drug
-                frequency = self._extract_frequency_near_drug(text_lower, match.start(), match.end())
-                
-                drug_info = {
-                    'name': drug_name.capitalize(),
-                    'generic_name': drug_name.capitalize(),  # Simplified
-                    'dosage_form': self._determine_dosage_form(text_lower, match.start(), match.end()),
-                    'strength': f"{dosage} {unit}",
-                    'route': 'oral',  # Default assumption
-                    'frequency': frequency
-                }
+                frequency = self._extract_frequency_near_drug(text, match.start(), match.end())
+                drugs.append(self._drug_from_match(text, match, frequency))
+        
+        return drugs
+    
+    def _hyperscan_extraction(self, text: str) -> List[Dict]:
+        """Extract drugs from a single Hyperscan pass over the text"""
+        drug_starts = [set() for _ in self.drug_patterns]
+        
+        def on_match(pattern_id, start, end, flags, context):
+            drug_starts[pattern_id].add(start)
+        
+        self._hs_db.scan(text.encode('ascii'), match_event_handler=on_match)
+        
+        return self._drugs_from_hits(text, drug_starts)
+    
+    def _drugs_from_hits(self, text: str, drug_starts: List[set]) -> List[Dict]:
+        """Build drugs from the match start offsets of each drug pattern"""
+        drugs = []
+        for pattern, starts in zip(self.drug_patterns, drug_starts):
+            # Replay the hits as non-overlapping matches, like finditer,
+            # and recover the capture groups with re at each start offset
+            last_end = 0
+            for start in sorted(starts):
+                if start < last_end:
+                    continue
+                match = pattern.match(text, start)
+                if not match:
+                    continue
+                last_end = match.end()
                 
-                drugs.append(drug_info)
+                # Same windowed search as the re path, so results agree
+                frequency = self._extract_frequency_near_drug(text, match.start(), match.end())
+                drugs.append(self._drug_from_match(text, match, frequency))
         
         return drugs
     
-    def _extract_dosage_for_drug(self, text: str, drug_name: str) -> Optional[Dict]:
-        """Extract dosage information for a specific drug"""
-        # Find the drug in text and look for nearby dosage info
-        text_lower = text.lower()
-        drug_lower = drug_name.lower()
+    def _drug_from_match(self, text: str, match: re.Match, frequency: str) -> Dict:
+        """Build a drug entry from a drug pattern match"""
+        drug_name = match.group(1)
+        dosage = match.group(2)
+        unit = match.group(3).lower()
         
-        drug_index = text_lower.find(drug_lower)
-        if drug_index == -1:
-            return None
+        return {
+            'name': drug_name.capitalize(),
+            'generic_name': drug_name.capitalize(),  # Simplified
+            'dosage_form': self._determine_dosage_form(text, match.start(), match.end()),
+            'strength': f"{dosage} {unit}",
+            'route': 'oral',  # Default assumption
+            'frequency': frequency
+        }
+    
+    def _extract_dosage_for_drug(self, text: str, start_pos: int, end_pos: int) -> Optional[Dict]:
+        """Extract dosage information for a drug entity at the given offsets"""
+        drug_name = text[start_pos:end_pos]
         
-        # Look in a window around the drug name
-        window_start = max(0, drug_index - 50)
-        window_end = min(len(text), drug_index + len(drug_name) + 50)
-        window_text = text_lower[window_start:window_end]
+        # Look in a window around the drug name; the patterns are
+        # case-insensitive so the window needn't be lowercased
+        window_start = max(0, start_pos - 50)
+        window_end = min(len(text), end_pos + 50)
+        window_text = text[window_start:window_end]
         
         # Extract dosage
-        dosage_pattern = r'(\d+(?:\.\d+)?)\s*(mg|ml|g|mcg)'
-        dosage_match = re.search(dosage_pattern, window_text)
+        dosage_match = self._DOSAGE_RE.search(window_text)
         
         if dosage_match:
             dosage = dosage_match.group(1)
-            unit = dosage_match.group(2)
+            unit = dosage_match.group(2).lower()
             frequency = self._extract_frequency_near_drug(window_text, 0, len(window_text))
             
             return {
@@ -126,9 +319,9 @@ class NLPDrugExtractor:
         window_text = text[window_start:window_end]
         
         for pattern in self.frequency_patterns:
-            match = re.search(pattern, window_text)
+            match = pattern.search(window_text)
             if match:
-                return match.group(0)
+                return match.group(0).lower()
         
         return "as directed"  # Default
     
@@ -136,7 +329,7 @@ class NLPDrugExtractor:
         """Determine dosage form from context"""
         window_start = max(0, start_pos - 20)
         window_end = min(len(text), end_pos + 20)
-        window_text = text[window_start:window_end]
+        window_text = text[window_start:window_end].lower()
         
         forms = {
             'tablet': ['tab', 'tablet'],
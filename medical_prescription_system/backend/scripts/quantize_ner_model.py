@@ -0,0 +1,32 @@
+"""Export the biomedical NER model to ONNX and quantize it to INT8.
+
+Requires optimum[onnxruntime]. Run once from the backend directory:
+
+    python -m scripts.quantize_ner_model
+
+NLPDrugExtractor picks up the quantized model on CPU when it exists.
+"""
+import tempfile
+
+from optimum.onnxruntime import ORTModelForTokenClassification, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
+from transformers import AutoTokenizer
+
+from app.services.nlp_extractor import NER_MODEL_NAME, QUANTIZED_MODEL_DIR
+
+def main():
+    with tempfile.TemporaryDirectory() as export_dir:
+        # Export the PyTorch model to ONNX
+        model = ORTModelForTokenClassification.from_pretrained(NER_MODEL_NAME, export=True)
+        model.save_pretrained(export_dir)
+
+        # Dynamic INT8 quantization using AVX-512 VNNI kernels
+        quantizer = ORTQuantizer.from_pretrained(export_dir)
+        qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=QUANTIZED_MODEL_DIR, quantization_config=qconfig)
+
+    AutoTokenizer.from_pretrained(NER_MODEL_NAME).save_pretrained(QUANTIZED_MODEL_DIR)
+    print(f"Quantized model saved to {QUANTIZED_MODEL_DIR}")
+
+if __name__ == "__main__":
+    main()
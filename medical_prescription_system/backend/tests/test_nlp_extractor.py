@@ -0,0 +1,60 @@
+import pytest
+
+from app.services.nlp_extractor import NLPDrugExtractor
+
+TEXTS = [
+    "Paracetamol 500mg tablet twice daily, Ibuprofen 400mg capsule thrice daily",
+    "Tab Amoxicillin 250 mg q8h and Metformin-500 mg bid",
+    # Frequency cut short by the end of the 30 character window
+    "Aspirin 75 mg with food, then every 12 hours",
+    # Word boundary at the window start that the full text does not have
+    "Nobid; taken after meals daily: Aspirin 75 mg",
+    "Warfarin 5 mgq12h then Digoxin 0.25 mg od",
+    "Atorvastatin 20 mg 12 times daily at night, Lisinopril 10 mg once a day",
+    "no medication mentioned here",
+]
+
+@pytest.fixture(scope="module")
+def extractor():
+    return NLPDrugExtractor()
+
+def _scanned_starts(extractor, text):
+    """Every offset where a drug pattern matches; Hyperscan reports a subset"""
+    return [
+        {start for start in range(len(text)) if pattern.match(text, start)}
+        for pattern in extractor.drug_patterns
+    ]
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_hit_replay_matches_re_path(extractor, text):
+    expected = []
+    for pattern in extractor.drug_patterns:
+        for match in pattern.finditer(text):
+            frequency = extractor._extract_frequency_near_drug(text, match.start(), match.end())
+            expected.append(extractor._drug_from_match(text, match, frequency))
+    
+    assert extractor._drugs_from_hits(text, _scanned_starts(extractor, text)) == expected
+
+@pytest.mark.parametrize("text, frequency", [
+    ("Aspirin 75 mg with food, then every 12 hours", "every 12 hour"),
+    ("Nobid; taken after meals daily: Aspirin 75 mg", "bid"),
+])
+def test_frequency_uses_window_text(extractor, text, frequency):
+    drugs = extractor._drugs_from_hits(text, _scanned_starts(extractor, text))
+    
+    assert [drug["frequency"] for drug in drugs] == [frequency]
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_hyperscan_matches_re_path(extractor, text):
+    pytest.importorskip("hyperscan")
+    if extractor._hs_db is None:
+        pytest.skip("Hyperscan database failed to compile")
+    
+    hs_drugs = extractor._regex_extraction(text)
+    hs_db, extractor._hs_db = extractor._hs_db, None
+    try:
+        re_drugs = extractor._regex_extraction(text)
+    finally:
+        extractor._hs_db = hs_db
+    
+    assert hs_drugs == re_drugs
@@ -1,8 +1,21 @@
 import streamlit as st
 import requests
-import json
-import pandas as pd
-from typing import Dict, List
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import gzip
+import hashlib
+import orjson
+import threading
+import time
+from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from batched_client import BatchedClient, BatchOperationError
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Configure page
 st.set_page_config(
@@ -14,14 +27,71 @@ st.set_page_config(
 
 # API Configuration
 API_BASE_URL = "http://localhost:8000/api/v1"
+API_TIMEOUT = (3, 30)  # (connect, read) seconds
+BATCH_RESULT_TIMEOUT = 60  # seconds to wait for a batched operation, queueing included
+EXTRACT_CACHE_VERSION = 1  # bump to invalidate extractions persisted on disk
+EXTRACT_CACHE_PERIOD = 24 * 3600  # seconds before a persisted extraction is refetched
+# Generation of the on-disk extraction cache, kept next to Streamlit's own cache files
+EXTRACT_CACHE_MARKER = Path.home() / ".streamlit" / "cache" / "extract_cache_generation"
 
 def init_session_state():
     """Initialize session state variables"""
-    if 'analysis_results' not in st.session_state:
-        st.session_state.analysis_results = None
+    if 'result_payload' not in st.session_state:
+        st.session_state.result_payload = None
     if 'patient_data' not in st.session_state:
         st.session_state.patient_data = {}
 
+@st.cache_resource(ttl=3600, max_entries=256, show_spinner=False)
+def _store_result(key: str, _results: Optional[dict] = None) -> dict:
+    """Server-wide store of analysis results; sessions keep only their request payload.
+    
+    Called with just the key it returns the stored results (shared, not
+    copied, so callers must not mutate them), raising KeyError once they
+    have been evicted (errors are not cached).
+    """
+    if _results is None:
+        raise KeyError(key)
+    return _results
+
+def _result_key(payload_json: bytes) -> str:
+    return hashlib.blake2b(payload_json, digest_size=16).hexdigest()
+
+def _load_result() -> Optional[dict]:
+    """Results for this session's analysis, or None if there are none.
+    
+    Evicted results are fetched again from the stored request payload,
+    which the analysis caches usually still answer.
+    """
+    payload_json = st.session_state.result_payload
+    if payload_json is None:
+        return None
+    key = _result_key(payload_json)
+    try:
+        return _store_result(key)
+    except KeyError:
+        pass
+    
+    try:
+        results = _analyze_shared(payload_json).result()
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError):
+        st.session_state.result_payload = None
+        st.warning("Your earlier analysis results expired and could not be reloaded. "
+                   "Please run the analysis again.")
+        return None
+    return _store_result(key, results)
+
+def _publish_results(results: dict, payload_json: bytes):
+    """Store fresh results for this session and rerun the app to show them"""
+    _store_result(_result_key(payload_json), results)
+    st.session_state.result_payload = payload_json
+    st.success("Analysis completed!")
+    st.rerun()
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _parse_allergies(raw: str) -> tuple:
+    """Split the allergies text into one entry per non-blank line"""
+    return tuple(allergy.strip() for allergy in raw.split('\n') if allergy.strip())
+
 def create_patient_sidebar():
     """Create patient information sidebar"""
     st.sidebar.header("👤 Patient Information")
@@ -39,7 +109,7 @@ def create_patient_sidebar():
     
     st.sidebar.subheader("Known Allergies")
     allergies = st.sidebar.text_area("Enter allergies (one per line)")
-    allergy_list = [allergy.strip() for allergy in allergies.split('\n') if allergy.strip()]
+    allergy_list = _parse_allergies(allergies)
     
     return {
         "age": age,
@@ -48,44 +118,212 @@ def create_patient_sidebar():
         "allergies": allergy_list
     }
 
-def analyze_prescription(patient_data: Dict, drugs: List[Dict], raw_text: str = None):
-    """Send prescription for analysis"""
+@st.cache_data(ttl=600, max_entries=128, show_spinner=False)
+def _analyze_cached(payload_json: bytes) -> dict:
+    """Call the analysis endpoint; cached on the canonical payload JSON.
+    
+    Failures raise so that they are not cached.
+    """
+    response = get_http_session().post(f"{API_BASE_URL}/analyze-prescription", 
+                                       data=payload_json,
+                                       headers={"Content-Type": "application/json"},
+                                       timeout=API_TIMEOUT)
+    response.raise_for_status()
+    return orjson.loads(response.content)
+
+def _payload_json(patient_data: Dict, drugs: List[Dict], raw_text: str = None) -> bytes:
+    payload = {
+        "patient": patient_data,
+        "drugs": drugs,
+        "raw_text": raw_text
+    }
+    # Sorted keys give identical prescriptions identical cache keys
+    return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS, default=str)
+
+def analyze_prescription(patient_data: Dict, drugs: List[Dict], raw_text: str = None,
+                         future: Optional[Future] = None):
+    """Send prescription for analysis, or collect an already submitted one"""
     try:
-        payload = {
-            "patient": patient_data,
-            "drugs": drugs,
-            "raw_text": raw_text
-        }
+        if future is None:
+            future = _analyze_shared(_payload_json(patient_data, drugs, raw_text))
+        return future.result()
         
-        response = requests.post(f"{API_BASE_URL}/analyze-prescription", 
-                               json=payload)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"API Error: {response.status_code} - {response.text}")
-            return None
-            
+    except requests.exceptions.HTTPError as e:
+        st.error(f"API Error: {e.response.status_code} - {e.response.text}")
+        return None
     except requests.exceptions.RequestException as e:
         st.error(f"Connection Error: {str(e)}")
         return None
+    except orjson.JSONDecodeError as e:
+        st.error(f"API Error: invalid response - {str(e)}")
+        return None
+
+@st.cache_resource
+def get_inflight() -> Tuple[Dict[bytes, Future], threading.Lock]:
+    """Analysis requests currently running, keyed by payload hash"""
+    return {}, threading.Lock()
+
+def _analyze_shared(payload_json: bytes) -> Future:
+    """Start an analysis, or attach to an identical one that is still running"""
+    inflight, lock = get_inflight()
+    key = hashlib.blake2b(payload_json, digest_size=16).digest()
+    
+    with lock:
+        future = inflight.get(key)
+        if future is not None:
+            return future
+        future = get_executor().submit(_analyze_cached, payload_json)
+        inflight[key] = future
+    
+    def _release(_):
+        with lock:
+            inflight.pop(key, None)
+    
+    future.add_done_callback(_release)
+    return future
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """Shared HTTP session so backend connections are pooled across reruns and users"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16,
+                          max_retries=Retry(total=2, backoff_factor=0.1))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_resource
+def get_batched_client() -> BatchedClient:
+    """Shared batching client so concurrent calls share one round trip"""
+    return BatchedClient(get_http_session(), API_BASE_URL, API_TIMEOUT)
+
+@st.cache_resource
+def get_executor() -> ThreadPoolExecutor:
+    """Shared worker threads for overlapping backend calls"""
+    return ThreadPoolExecutor(max_workers=4)
+
+@st.cache_resource
+def warmup() -> Dict[str, object]:
+    """Build the shared backend clients once, before the first user action needs them"""
+    return {
+        "session": get_http_session(),
+        "executor": get_executor(),
+        "batcher": get_batched_client(),
+    }
+
+@st.cache_resource
+def _extract_cache_state() -> Dict[str, object]:
+    """Generation this process last checked the disk cache against"""
+    return {"generation": None, "lock": threading.Lock()}
+
+def _roll_extract_cache(generation: str):
+    """Drop persisted extractions once the cache generation changes.
+    
+    Streamlit never evicts disk-persisted entries (ttl and max_entries only
+    bound the in-memory copy), so without this each day bucket or version
+    bump would strand a full set of files.
+    """
+    state = _extract_cache_state()
+    if state["generation"] == generation:
+        return
+    with state["lock"]:
+        if state["generation"] == generation:
+            return
+        try:
+            stored = EXTRACT_CACHE_MARKER.read_text()
+        except OSError:
+            stored = None
+        if stored != generation:
+            _fetch_extract.clear()
+            try:
+                EXTRACT_CACHE_MARKER.parent.mkdir(parents=True, exist_ok=True)
+                EXTRACT_CACHE_MARKER.write_text(generation)
+            except OSError as e:
+                print(f"Error saving extraction cache generation: {e}")
+        state["generation"] = generation
+
+def _extract_cache_key(text: str) -> str:
+    """Disk cache key for an extraction: version, day bucket and normalized text.
+    
+    Streamlit ignores ttl on disk-persisted caches, so entries expire by
+    the day bucket changing instead, and the previous generation's files
+    are cleared then; bump EXTRACT_CACHE_VERSION whenever the backend
+    extractor or its model changes. The disk cache thus holds at most one
+    period's distinct texts.
+    """
+    generation = f"{EXTRACT_CACHE_VERSION}:{int(time.time() // EXTRACT_CACHE_PERIOD)}"
+    _roll_extract_cache(generation)
+    return f"{generation}:{text.strip().lower()}"
 
-def extract_drugs_from_text(text: str):
-    """Extract drugs from unstructured text"""
+@st.cache_data(max_entries=10_000, persist="disk", show_spinner=False)
+def _fetch_extract(cache_key: str, _text: str) -> list:
+    """Call the extraction endpoint; cached on disk on the cache key only.
+    
+    Failures raise so that they are not cached. Entries that fail to
+    unpickle are treated by Streamlit as misses and fetched again.
+    """
+    future = get_batched_client().submit("extract", _text)
+    return future.result(timeout=BATCH_RESULT_TIMEOUT).get("drugs", [])
+
+def extract_drugs_from_text(text: str, future: Optional[Future] = None) -> list:
+    """Extract drugs from unstructured text, or collect an already submitted extraction"""
     try:
-        response = requests.post(f"{API_BASE_URL}/extract-drugs", 
-                               params={"text": text})
-        
-        if response.status_code == 200:
-            return response.json().get("drugs", [])
-        else:
-            st.error(f"Extraction Error: {response.status_code}")
-            return []
+        if future is not None:
+            return future.result()
+        return _fetch_extract(_extract_cache_key(text), text)
             
+    except BatchOperationError as e:
+        st.error(f"Extraction Error: {e.status_code}")
+        return []
+    except FutureTimeoutError:
+        st.error("Extraction Error: timed out waiting for the backend")
+        return []
+    except requests.exceptions.HTTPError as e:
+        st.error(f"Extraction Error: {e.response.status_code}")
+        return []
     except requests.exceptions.RequestException as e:
         st.error(f"Connection Error: {str(e)}")
         return []
+    except orjson.JSONDecodeError as e:
+        st.error(f"Extraction Error: invalid response - {str(e)}")
+        return []
 
+def extract_and_analyze(patient_data: Dict, raw_text: str) -> Tuple[list, Optional[dict]]:
+    """Extract drugs and analyze the raw text concurrently.
+    
+    The backend extracts drugs itself when analyzing raw text, so both
+    requests can run at once and total latency is the slower of the two.
+    """
+    executor = get_executor()
+    extract_future = executor.submit(_fetch_extract, _extract_cache_key(raw_text), raw_text)
+    analyze_future = _analyze_shared(_payload_json(patient_data, [], raw_text))
+    wait([extract_future, analyze_future])
+    
+    # Errors are rendered here, on the script thread
+    extracted_drugs = extract_drugs_from_text(raw_text, future=extract_future)
+    results = analyze_prescription(patient_data, [], raw_text, future=analyze_future)
+    return extracted_drugs, results
+
+# Row background for each severity in the interactions table
+SEVERITY_ROW_STYLES = {
+    "contraindicated": "background-color: #f8c9c9",
+    "severe": "background-color: #fdd",
+    "moderate": "background-color: #fff3cd",
+    "mild": "background-color: #e7f3fe",
+}
+
+# Banner for the selected interaction; unknown severities get an unlabeled info banner
+SEVERITY_RENDER = {
+    "contraindicated": (st.error, "⛔ **CONTRAINDICATED**"),
+    "severe": (st.error, "🚨 **SEVERE**"),
+    "moderate": (st.warning, "⚠️ **MODERATE**"),
+    "mild": (st.info, "ℹ️ **MILD**"),
+}
+
+def _severity_row_style(row: "pd.Series") -> List[str]:
+    return [SEVERITY_ROW_STYLES.get(row["_severity"], "")] * len(row)
+
+@st.fragment
 def display_interactions(interactions: List[Dict]):
     """Display drug interactions"""
     if not interactions:
@@ -94,22 +332,42 @@ def display_interactions(interactions: List[Dict]):
     
     st.subheader("⚠️ Drug Interactions Detected")
     
-    for interaction in interactions:
-        severity = interaction['severity']
-        
-        # Color coding based on severity
-        if severity == 'severe':
-            st.error(f"🚨 **SEVERE**: {interaction['drug1'].title()} ↔️ {interaction['drug2'].title()}")
-        elif severity == 'moderate':
-            st.warning(f"⚠️ **MODERATE**: {interaction['drug1'].title()} ↔️ {interaction['drug2'].title()}")
-        else:
-            st.info(f"ℹ️ **MILD**: {interaction['drug1'].title()} ↔️ {interaction['drug2'].title()}")
-        
-        with st.expander(f"Details: {interaction['drug1'].title()} + {interaction['drug2'].title()}"):
-            st.write(f"**Description:** {interaction['description']}")
-            st.write(f"**Mechanism:** {interaction['mechanism']}")
-            st.write(f"**Management:** {interaction['management']}")
+    # Imported on first use to keep pandas off the cold-start path
+    import pandas as pd
+    
+    # One table for all interactions instead of a widget set per row
+    df = pd.DataFrame(interactions)
+    df["d1"] = df["drug1"].str.title()
+    df["d2"] = df["drug2"].str.title()
+    table = pd.DataFrame({
+        "Severity": df["severity"].str.upper(),
+        "Drug 1": df["d1"],
+        "Drug 2": df["d2"],
+        "Description": df["description"],
+        "_severity": df["severity"],
+    })
+    st.dataframe(
+        table.style.apply(_severity_row_style, axis=1),
+        column_order=["Severity", "Drug 1", "Drug 2", "Description"],
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    # Full details only for the interaction the user picks
+    options = [f"{row.Index + 1}. {row.d1} + {row.d2}" for row in df.itertuples()]
+    selected = options.index(st.selectbox("Interaction details", options))
+    row = next(df.iloc[selected:selected + 1].itertuples())
+    
+    # Color coding based on severity
+    render, label = SEVERITY_RENDER.get(row.severity, (st.info, "ℹ️"))
+    render(f"{label}: {row.d1} ↔️ {row.d2}")
+    
+    with st.expander(f"Details: {row.d1} + {row.d2}", expanded=True):
+        st.write(f"**Description:** {row.description}")
+        st.write(f"**Mechanism:** {row.mechanism}")
+        st.write(f"**Management:** {row.management}")
 
+@st.fragment
 def display_dosage_recommendations(recommendations: List[Dict]):
     """Display dosage recommendations"""
     if not recommendations:
@@ -131,6 +389,7 @@ def display_dosage_recommendations(recommendations: List[Dict]):
                 if rec.get('special_instructions'):
                     st.write(f"**Special Instructions:** {rec['special_instructions']}")
 
+@st.fragment
 def display_alternatives(alternatives: List[Dict]):
     """Display alternative medications"""
     if not alternatives:
@@ -139,20 +398,190 @@ def display_alternatives(alternatives: List[Dict]):
     
     st.subheader("🔄 Alternative Medications")
     
-    df_data = []
-    for alt in alternatives:
-        df_data.append({
-            "Original Drug": alt['original_drug'].title(),
-            "Alternative": alt['alternative_drug'].title(),
-            "Reason": alt['reason'],
-            "Safety Profile": alt['safety_profile']
-        })
+    import pandas as pd
     
-    df = pd.DataFrame(df_data)
+    alts = pd.DataFrame(alternatives)
+    df = pd.DataFrame({
+        "Original Drug": alts['original_drug'].str.title(),
+        "Alternative": alts['alternative_drug'].str.title(),
+        "Reason": alts['reason'],
+        "Safety Profile": alts['safety_profile']
+    })
     st.dataframe(df, use_container_width=True)
 
+@st.fragment
+def display_warnings(warnings: List[str]):
+    """Display patient-specific warnings"""
+    if warnings:
+        for warning in warnings:
+            st.warning(f"⚠️ {warning}")
+    else:
+        st.success("No specific warnings for this patient profile")
+
+def _remove_drug(index: int):
+    """Drop the drug at index from the current prescription"""
+    st.session_state.current_drugs = [
+        d for j, d in enumerate(st.session_state.current_drugs) if j != index
+    ]
+
+# Results sections: label -> (renderer, results field)
+RESULT_SECTIONS = {
+    "🔄 Interactions": (display_interactions, "interactions"),
+    "💊 Dosages": (display_dosage_recommendations, "dosage_recommendations"),
+    "🔄 Alternatives": (display_alternatives, "alternatives"),
+    "⚠️ Warnings": (display_warnings, "warnings"),
+}
+
+@st.fragment
+def prescription_input_fragment():
+    """Prescription entry; reruns on its own while the user edits the input"""
+    st.header("📝 Prescription Input")
+    
+    # Input method selection
+    input_method = st.radio(
+        "Choose input method:",
+        ["Manual Drug Entry", "Text Extraction"]
+    )
+    
+    drugs = []
+    raw_text = None
+    
+    if input_method == "Manual Drug Entry":
+        st.subheader("Add Medications")
+        
+        # Drug entry form
+        with st.form("drug_form"):
+            col_name, col_dose, col_form = st.columns(3)
+            
+            with col_name:
+                drug_name = st.text_input("Drug Name")
+            with col_dose:
+                strength = st.text_input("Strength (e.g., 500 mg)")
+            with col_form:
+                dosage_form = st.selectbox("Form", 
+                                         ["tablet", "capsule", "syrup", "injection"])
+            
+            route = st.selectbox("Route", ["oral", "IV", "IM", "topical"])
+            
+            if st.form_submit_button("Add Drug"):
+                if drug_name and strength:
+                    drug = {
+                        "name": drug_name,
+                        "generic_name": drug_name,
+                        "dosage_form": dosage_form,
+                        "strength": strength,
+                        "route": route
+                    }
+                    
+                    if 'current_drugs' not in st.session_state:
+                        st.session_state.current_drugs = []
+                    st.session_state.current_drugs.append(drug)
+                    st.success(f"Added {drug_name}")
+        
+        # Display current drugs
+        if 'current_drugs' in st.session_state and st.session_state.current_drugs:
+            st.subheader("Current Prescription")
+            for i, drug in enumerate(st.session_state.current_drugs):
+                col_drug, col_remove = st.columns([4, 1])
+                with col_drug:
+                    st.write(f"**{drug['name']}** - {drug['strength']} ({drug['dosage_form']})")
+                with col_remove:
+                    # Removed in the callback, before the rerun renders the list
+                    st.button("Remove", key=f"remove_{i}", on_click=_remove_drug, args=(i,))
+            
+            drugs = st.session_state.current_drugs
+    
+    else:  # Text Extraction
+        st.subheader("Enter Prescription Text")
+        
+        # Typing in a form does not rerun the app until it is submitted
+        with st.form("rx_input_form"):
+            raw_text = st.text_area(
+                "Paste prescription text here:",
+                height=200,
+                placeholder="e.g., Paracetamol 500mg tablet twice daily, Ibuprofen 400mg capsule thrice daily..."
+            )
+            col_extract, col_analyze = st.columns(2)
+            with col_extract:
+                extract_clicked = st.form_submit_button("Extract Drugs", use_container_width=True)
+            with col_analyze:
+                # Submits the typed text too, which the button outside the form cannot see
+                analyze_clicked = st.form_submit_button("🚀 Extract & Analyze", type="primary",
+                                                        use_container_width=True)
+        
+        if analyze_clicked and raw_text:
+            with st.spinner("Analyzing prescription..."):
+                # Extract and analyze in parallel
+                extracted_drugs, results = extract_and_analyze(st.session_state.patient_data, raw_text)
+                if extracted_drugs:
+                    st.session_state.extracted = {"text": raw_text, "drugs": extracted_drugs}
+                if results:
+                    _publish_results(results, _payload_json(st.session_state.patient_data, [], raw_text))
+        
+        if extract_clicked and raw_text:
+            with st.spinner("Extracting drug information..."):
+                extracted_drugs = extract_drugs_from_text(raw_text)
+                if extracted_drugs:
+                    st.success(f"Extracted {len(extracted_drugs)} medications")
+                    st.session_state.extracted = {"text": raw_text, "drugs": extracted_drugs}
+        
+        # Keep extracted drugs across reruns while the text is unchanged
+        extracted = st.session_state.get("extracted")
+        if extracted and raw_text and extracted["text"] == raw_text:
+            drugs = extracted["drugs"]
+            
+            # Display extracted drugs
+            st.subheader("Extracted Medications")
+            for drug in drugs:
+                st.write(f"- **{drug['name']}** ({drug['strength']}) - {drug.get('frequency', 'as directed')}")
+    
+    # Hand the input over to the analysis column through session state
+    st.session_state.input_drugs = drugs
+    st.session_state.input_raw_text = raw_text
+
+@st.fragment
+def results_fragment():
+    """Analysis results; reruns on its own for tab and export interactions"""
+    results = _load_result()
+    if not results:
+        return
+    
+    st.markdown("---")
+    st.header("📊 Analysis Results")
+    
+    # Safety indicator
+    if results['is_safe']:
+        st.success("✅ Prescription appears to be safe overall")
+    else:
+        st.error("❌ Prescription has significant safety concerns")
+    
+    # st.tabs runs every tab body on each rerun; a selector renders only the active one
+    section = st.radio("Section", list(RESULT_SECTIONS), horizontal=True,
+                       label_visibility="collapsed", key="results_section")
+    render, field = RESULT_SECTIONS[section]
+    render(results.get(field, []))
+    
+    # Export functionality
+    st.subheader("📥 Export Results")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if st.button("Download JSON Report"):
+            report = gzip.compress(orjson.dumps(results, option=orjson.OPT_INDENT_2), compresslevel=6)
+            st.download_button(
+                label="Download JSON (gz)",
+                data=report,
+                file_name="prescription_analysis.json.gz",
+                mime="application/gzip"
+            )
+    
+    with col2:
+        if st.button("Generate PDF Report"):
+            st.info("PDF generation feature coming soon!")
+
 def main():
     """Main Streamlit application"""
+    warmup()
     init_session_state()
     
     # Header
@@ -167,106 +596,29 @@ def main():
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        st.header("📝 Prescription Input")
-        
-        # Input method selection
-        input_method = st.radio(
-            "Choose input method:",
-            ["Manual Drug Entry", "Text Extraction"]
-        )
-        
-        drugs = []
-        raw_text = None
-        
-        if input_method == "Manual Drug Entry":
-            st.subheader("Add Medications")
-            
-            # Drug entry form
-            with st.form("drug_form"):
-                col_name, col_dose, col_form = st.columns(3)
-                
-                with col_name:
-                    drug_name = st.text_input("Drug Name")
-                with col_dose:
-                    strength = st.text_input("Strength (e.g., 500 mg)")
-                with col_form:
-                    dosage_form = st.selectbox("Form", 
-                                             ["tablet", "capsule", "syrup", "injection"])
-                
-                route = st.selectbox("Route", ["oral", "IV", "IM", "topical"])
-                
-                if st.form_submit_button("Add Drug"):
-                    if drug_name and strength:
-                        drug = {
-                            "name": drug_name,
-                            "generic_name": drug_name,
-                            "dosage_form": dosage_form,
-                            "strength": strength,
-                            "route": route
-                        }
-                        
-                        if 'current_drugs' not in st.session_state:
-                            st.session_state.current_drugs = []
-                        st.session_state.current_drugs.append(drug)
-                        st.success(f"Added {drug_name}")
-                        st.rerun()
-            
-            # Display current drugs
-            if 'current_drugs' in st.session_state and st.session_state.current_drugs:
-                st.subheader("Current Prescription")
-                for i, drug in enumerate(st.session_state.current_drugs):
-                    col_drug, col_remove = st.columns([4, 1])
-                    with col_drug:
-                        st.write(f"**{drug['name']}** - {drug['strength']} ({drug['dosage_form']})")
-                    with col_remove:
-                        if st.button("Remove", key=f"remove_{i}"):
-                            st.session_state.current_drugs.pop(i)
-                            st.rerun()
-                
-                drugs = st.session_state.current_drugs
-        
-        else:  # Text Extraction
-            st.subheader("Enter Prescription Text")
-            raw_text = st.text_area(
-                "Paste prescription text here:",
-                height=200,
-                placeholder="e.g., Paracetamol 500mg tablet twice daily, Ibuprofen 400mg capsule thrice daily..."
-            )
-            
-            if st.button("Extract Drugs") and raw_text:
-                with st.spinner("Extracting drug information..."):
-                    extracted_drugs = extract_drugs_from_text(raw_text)
-                    if extracted_drugs:
-                        st.success(f"Extracted {len(extracted_drugs)} medications")
-                        drugs = extracted_drugs
-                        
-                        # Display extracted drugs
-                        st.subheader("Extracted Medications")
-                        for drug in extracted_drugs:
-                            st.write(f"- **{drug['name']}** ({drug['strength']}) - {drug.get('frequency', 'as directed')}")
+        prescription_input_fragment()
     
     with col2:
         st.header("🔍 Quick Analysis")
+        drugs = st.session_state.get("input_drugs", [])
+        raw_text = st.session_state.get("input_raw_text")
         
         if st.button("🚀 Analyze Prescription", type="primary", use_container_width=True):
-            if not drugs:
+            if not drugs and not raw_text:
                 st.error("Please add medications to analyze")
             else:
                 with st.spinner("Analyzing prescription..."):
-                    # Prepare request
-                    request_data = {
-                        "patient": patient_data,
-                        "drugs": drugs,
-                        "raw_text": raw_text
-                    }
-                    
-                    # Get analysis
-                    results = analyze_prescription(patient_data, drugs, raw_text)
+                    if drugs:
+                        # Get analysis
+                        results = analyze_prescription(patient_data, drugs, raw_text)
+                    else:
+                        # Not extracted yet: extract and analyze in parallel
+                        extracted_drugs, results = extract_and_analyze(patient_data, raw_text)
+                        if extracted_drugs:
+                            st.session_state.extracted = {"text": raw_text, "drugs": extracted_drugs}
                     
                     if results:
-                        st.session_state.analysis_results = results
-                        st.success("Analysis completed!")
-                        st.rerun()
+                        _publish_results(results, _payload_json(patient_data, drugs, raw_text))
         
         # Display patient summary
         st.subheader("👤 Patient Summary")
@@ -278,60 +630,7 @@ def main():
             st.write(f"**Allergies:** {', '.join(patient_data['allergies'])}")
     
     # Display results
-    if st.session_state.analysis_results:
-        st.markdown("---")
-        st.header("📊 Analysis Results")
-        
-        results = st.session_state.analysis_results
-        
-        # Safety indicator
-        if results['is_safe']:
-            st.success("✅ Prescription appears to be safe overall")
-        else:
-            st.error("❌ Prescription has significant safety concerns")
-        
-        # Create tabs for different sections
-        tab1, tab2, tab3, tab4 = st.tabs([
-            "🔄 Interactions", 
-            "💊 Dosages", 
-            "🔄 Alternatives", 
-            "⚠️ Warnings"
-        ])
-        
-        with tab1:
-            display_interactions(results.get('interactions', []))
-        
-        with tab2:
-            display_dosage_recommendations(results.get('dosage_recommendations', []))
-        
-        with tab3:
-            display_alternatives(results.get('alternatives', []))
-        
-        with tab4:
-            warnings = results.get('warnings', [])
-            if warnings:
-                for warning in warnings:
-                    st.warning(f"⚠️ {warning}")
-            else:
-                st.success("No specific warnings for this patient profile")
-        
-        # Export functionality
-        st.subheader("📥 Export Results")
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            if st.button("Download JSON Report"):
-                report = json.dumps(results, indent=2)
-                st.download_button(
-                    label="Download JSON",
-                    data=report,
-                    file_name="prescription_analysis.json",
-                    mime="application/json"
-                )
-        
-        with col2:
-            if st.button("Generate PDF Report"):
-                st.info("PDF generation feature coming soon!")
+    results_fragment()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file